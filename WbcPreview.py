@@ -13,11 +13,15 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import bisect
+import collections
+import functools
 import logging
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta, datetime
 
-from bs4 import Tag, NavigableString, Comment
+from bs4 import Comment
 
 from WbcUtility import parse_url, localize
 
@@ -27,36 +31,143 @@ if __name__ == '__main__':
 
 LOG = logging.getLogger('WbcPreview')
 
+ONE_HOUR = timedelta(hours=1)
+
+
+@functools.lru_cache(maxsize=1024)
+def localize_cached(timestamp):
+    """Return localize(timestamp), remembering results since event times repeat across tourneys"""
+    return localize(timestamp)
+
 
 # ----- Token -----------------------------------------------------------------
 
 class Token(object):
-    """Simple data object for breaking descriptions into parseable tokens"""
+    """Simple data object for breaking descriptions into parseable tokens
+
+    Tokens are built once and shared through the lookup tables, so they compare by identity.
+    """
 
     INITIALIZED = False
 
-    CONTINUOUS = PATTERN = DASH = SLASH = PLUS = AT = AND = AM = PM = None
+    CONTINUOUS = PATTERN = SCANNER_RE = DASH = SLASH = PLUS = AT = AND = AM = PM = None
+
+    WHITESPACE_RE = re.compile(r'\s+')
 
     LOOKUP = {}
     DAYS = {}
+    NUMBERS = {}
     ICONS = {}
+    ICON_SOURCES = {}
+    IGNORED_ICONS = frozenset(['stadium', 'class_a', 'class_b', 'coached'])
+
+    # Seven Springs rooms, each as (name, aliases...)
+    SEVEN_SPRINGS_ROOMS = (
+        ('Alpine',),
+        ('Ballroom', 'Ballroom B'),
+        ('Ballroom Stage',),
+        ('Bavarian Lounge',),
+        ('Chestnut',),
+        ('Dogwood', 'Dogwood Forum'),
+        ('Evergreen',),
+        ('Evergreen & Chestnut',),
+        ('Exhibit Annex T1', 'Exhibit Annex Table 1', 'Exhibit annex Table 1'),
+        ('Exhibit Annex T2', 'Exhibit Annex Table 2', 'Exhibit annex Table 2'),
+        ('Exhibit Annex T3', 'Exhibit Annex Table 3', 'Exhibit annex Table 3'),
+        ('Exhibit Annex T4', 'Exhibit Annex Table 4', 'Exhibit annex Table 4'),
+        ('Exhibit Annex T5', 'Exhibit Annex Table 5', 'Exhibit annex Table 5'),
+        ('Exhibit Annex T6', 'Exhibit Annex Table 6', 'Exhibit annex Table 6'),
+        ('Exhibit Annex T7', 'Exhibit Annex Table 7', 'Exhibit annex Table 7'),
+        ('Exhibit Annex T8', 'Exhibit Annex Table 8', 'Exhibit annex Table 8'),
+        ('Exhibit Annex T9', 'Exhibit Annex Table 9', 'Exhibit annex Table 9'),
+        ('Exhibit Hall',),
+        ('Winterberry', 'Festival Hall', 'Festival'),
+        ('First Tracks Center', 'Ski Lodge First Tracks Center'),
+        ('First Tracks Poolside', 'Ski Lodge First Tracks Poolside'),
+        ('First Tracks Slopeside', 'Ski Lodge First Tracks Slopeside'),
+        ('Foggy Brews',),
+        ('Foggy Goggle Center', 'Ski Lodge Foggy Goggle Center'),
+        ('Foggy Goggle Front', 'Ski Lodge Foggy Goggle Front'),
+        ('Foggy Goggle Rear', 'Ski Lodge Foggy Goggle Rear'),
+        ('Fox Den',),
+        ('Hemlock',),
+        ('Laurel',),
+        ('Maple Room', 'Maple', 'Ski Lodge Maple Room'),
+        ('Rathskeller',),
+        ('Seasons',),
+        ('Seasons 1',),
+        ('Seasons 1-2',),
+        ('Seasons 1-3',),
+        ('Seasons 1-4',),
+        ('Seasons 1-5',),
+        ('Seasons 2',),
+        ('Seasons 2-3',),
+        ('Seasons 2-4',),
+        ('Seasons 2-5',),
+        ('Seasons 3',),
+        ('Seasons 3-4',),
+        ('Seasons 3-5',),
+        ('Seasons 4',),
+        ('Seasons 4-5',),
+        ('Seasons 5',),
+        ('Snowflake Forum', 'Snowflake'),
+        ('Stag Pass',),
+        ('Sunburst Forum',),
+        ('Timberstone',),
+        ('Wintergreen',),
+
+        # Misspelled Room Names
+        ('Ski Lodge Fast Tracks Center',),
+        ('Ski Lodge Foggie Goggle Front',),
+        ('Fast Tracks Slopeside',),
+    )
+
+    # Lancaster Host rooms, each as (name, aliases...)
+    HOST_ROOMS = (
+        ('Ballroom A',),
+        ('Ballroom B',),
+        ('Ballroom AB', 'Ballroom'),
+        ('Conestoga 1',),
+        ('Conestoga 2',),
+        ('Conestoga 3', 'Coonestoga 3'),
+        ('Cornwall', 'Cromwell'),
+        ('Heritage',),
+        ('Hopewell',),
+        ('Kinderhook',),
+        ('Lampeter',),
+        ('Laurel Grove',),
+        ('Limerock',),
+        ('Marietta',),
+        ('New Holland',),
+        ('Paradise',),
+        ('Showroom',),
+        ('Strasburg',),
+        ('Wheatland',),
+        ('Terrace 1',),
+        ('Terrace 2',),
+        ('Terrace 3',),
+        ('Terrace 4',),
+        ('Terrace 5',),
+        ('Terrace 6',),
+        ('Terrace 7',),
+        ('Vista C',),
+        ('Vista D',),
+        ('Vista CD', 'Vista'),
+    )
+
+    __slots__ = ('type', 'label', 'value', 'kind', 'display')
 
     def __init__(self, t, l=None, v=None):
         self.type = t
         self.label = l
         self.value = v
+        self.kind = l if t == 'Symbol' else t  # Symbols are told apart by their label
+        self.display = str(l) if l else t
 
     def __str__(self):
-        return str(self.label) if self.label else self.type
-
-    def __repr__(self):
-        return self.__str__()
-
-    def __eq__(self, other):
-        return self.type == other.type and self.label == other.label and self.value == other.value
+        return self.display
 
-    def __ne__(self, other):
-        return not self.__eq__(other)
+    __repr__ = __str__
 
     @classmethod
     def initialize(cls):
@@ -114,6 +225,9 @@ class Token(object):
 
         cls.LOOKUP['HMWG'] = Token('Format', 'HMWG')
 
+        # Share tokens for the small numbers (days, hours, heats) that dominate schedules; others are added as seen
+        cls.NUMBERS = {str(n): Token('Number', str(n), n) for n in range(32)}
+
         cls.initialize_7springs_rooms()
 
         cls.AT = Token('Symbol', '@')
@@ -123,7 +237,7 @@ class Token(object):
         cls.SLASH = Token('Symbol', '/')
         cls.START = Token('Symbol', '|')
 
-        cls.PATTERN = '|'.join(sorted(list(cls.LOOKUP.keys()), reverse=True))
+        cls.PATTERN = cls.trie_pattern(cls.LOOKUP.keys())
 
         cls.LOOKUP['&'] = cls.AND
         cls.LOOKUP['@'] = cls.AT
@@ -132,7 +246,29 @@ class Token(object):
         cls.LOOKUP['/'] = cls.SLASH
         cls.LOOKUP['|'] = cls.START
 
-        cls.PATTERN += '|[@&+-/]'
+        cls.PATTERN += '|[@&+/-]'
+
+        # One alternation for everything the tokenizer recognizes: separators, phrases and symbols, numbers
+        cls.SCANNER_RE = re.compile(r'(?P<Skip>[,;: ]+)|(?P<Phrase>%s)|(?P<Number>\d+)' % cls.PATTERN, re.ASCII)
+
+    @staticmethod
+    def trie_pattern(phrases):
+        """Return a regex matching the longest of phrases, factored by common prefix so each character is tried once"""
+        trie = {}
+        for phrase in phrases:
+            node = trie
+            for ch in phrase:
+                node = node.setdefault(ch, {})
+            node[''] = None  # A phrase ends here
+
+        def pattern(node):
+            branches = [re.escape(ch) + pattern(child) for ch, child in sorted(node.items()) if ch]
+            if not branches:
+                return ''
+            body = branches[0] if len(branches) == 1 else '(?:%s)' % '|'.join(branches)
+            return '(?:%s)?' % body if '' in node else body  # Greedy, so longer phrases win
+
+        return pattern(trie)
 
     @classmethod
     def add_event(cls, primary, *aliases):
@@ -157,111 +293,20 @@ class Token(object):
             cls.LOOKUP[alias] = day
 
     @classmethod
-    def add_room(cls, primary, *aliases):
-        room = Token('Room', primary)
-        cls.LOOKUP[primary] = room
-        for alias in aliases:
-            cls.LOOKUP[alias] = room
+    def add_rooms(cls, rooms):
+        """Add a table of (name, aliases...) rooms to LOOKUP in one update"""
+        lookup = {}
+        for names in rooms:
+            lookup.update(dict.fromkeys(names, Token('Room', names[0])))
+        cls.LOOKUP.update(lookup)
 
     @classmethod
     def initialize_7springs_rooms(cls):
-        cls.add_room('Alpine')
-        cls.add_room('Ballroom', 'Ballroom B')
-        cls.add_room('Ballroom Stage')
-        cls.add_room('Bavarian Lounge')
-        cls.add_room('Chestnut')
-        cls.add_room('Dogwood', 'Dogwood Forum')
-        cls.add_room('Evergreen')
-        cls.add_room('Evergreen & Chestnut')
-        cls.add_room('Exhibit Annex T1', 'Exhibit Annex Table 1', 'Exhibit annex Table 1')
-        cls.add_room('Exhibit Annex T2', 'Exhibit Annex Table 2', 'Exhibit annex Table 2')
-        cls.add_room('Exhibit Annex T3', 'Exhibit Annex Table 3', 'Exhibit annex Table 3')
-        cls.add_room('Exhibit Annex T4', 'Exhibit Annex Table 4', 'Exhibit annex Table 4')
-        cls.add_room('Exhibit Annex T5', 'Exhibit Annex Table 5', 'Exhibit annex Table 5')
-        cls.add_room('Exhibit Annex T6', 'Exhibit Annex Table 6', 'Exhibit annex Table 6')
-        cls.add_room('Exhibit Annex T7', 'Exhibit Annex Table 7', 'Exhibit annex Table 7')
-        cls.add_room('Exhibit Annex T8', 'Exhibit Annex Table 8', 'Exhibit annex Table 8')
-        cls.add_room('Exhibit Annex T9', 'Exhibit Annex Table 9', 'Exhibit annex Table 9')
-        cls.add_room('Exhibit Hall')
-        cls.add_room('Winterberry', 'Festival Hall', 'Festival')
-        cls.add_room('First Tracks Center', 'Ski Lodge First Tracks Center')
-        cls.add_room('First Tracks Poolside', 'Ski Lodge First Tracks Poolside')
-        cls.add_room('First Tracks Slopeside', 'Ski Lodge First Tracks Slopeside')
-        cls.add_room('Foggy Brews')
-        cls.add_room('Foggy Goggle Center', 'Ski Lodge Foggy Goggle Center')
-        cls.add_room('Foggy Goggle Front', 'Ski Lodge Foggy Goggle Front')
-        cls.add_room('Foggy Goggle Rear', 'Ski Lodge Foggy Goggle Rear')
-        cls.add_room('Fox Den')
-        cls.add_room('Hemlock')
-        cls.add_room('Laurel')
-        cls.add_room('Maple Room', 'Maple', 'Ski Lodge Maple Room')
-        cls.add_room('Rathskeller')
-        cls.add_room('Seasons')
-        cls.add_room('Seasons 1')
-        cls.add_room('Seasons 1-2')
-        cls.add_room('Seasons 1-3')
-        cls.add_room('Seasons 1-4')
-        cls.add_room('Seasons 1-5')
-        cls.add_room('Seasons 2')
-        cls.add_room('Seasons 2-3')
-        cls.add_room('Seasons 2-4')
-        cls.add_room('Seasons 2-5')
-        cls.add_room('Seasons 3')
-        cls.add_room('Seasons 3-4')
-        cls.add_room('Seasons 3-5')
-        cls.add_room('Seasons 4')
-        cls.add_room('Seasons 4-5')
-        cls.add_room('Seasons 5')
-        cls.add_room('Snowflake Forum', 'Snowflake')
-        cls.add_room('Stag Pass')
-        cls.add_room('Sunburst Forum')
-        cls.add_room('Timberstone')
-        cls.add_room('Wintergreen')
-
-        # Misspelled Room Names
-        cls.add_room('Ski Lodge Fast Tracks Center')
-        cls.add_room('Ski Lodge Foggie Goggle Front')
-        cls.add_room('Fast Tracks Slopeside')
+        cls.add_rooms(cls.SEVEN_SPRINGS_ROOMS)
 
     @classmethod
     def initialize_host_rooms(cls):
-        cls.LOOKUP['Ballroom A'] = Token('Room', 'Ballroom A')
-        cls.LOOKUP['Ballroom B'] = Token('Room', 'Ballroom B')
-        cls.LOOKUP['Ballroom AB'] = Token('Room', 'Ballroom AB')
-        cls.LOOKUP['Ballroom'] = cls.LOOKUP['Ballroom AB']
-
-        cls.LOOKUP['Conestoga 1'] = Token('Room', 'Conestoga 1')
-        cls.LOOKUP['Conestoga 2'] = Token('Room', 'Conestoga 2')
-        cls.LOOKUP['Conestoga 3'] = Token('Room', 'Conestoga 3')
-        cls.LOOKUP['Coonestoga 3'] = cls.LOOKUP['Conestoga 3']
-
-        cls.LOOKUP['Cornwall'] = Token('Room', 'Cornwall')
-        cls.LOOKUP['Cromwell'] = cls.LOOKUP['Cornwall']
-        cls.LOOKUP['Heritage'] = Token('Room', 'Heritage')
-        cls.LOOKUP['Hopewell'] = Token('Room', 'Hopewell')
-        cls.LOOKUP['Kinderhook'] = Token('Room', 'Kinderhook')
-        cls.LOOKUP['Lampeter'] = Token('Room', 'Lampeter')
-        cls.LOOKUP['Laurel Grove'] = Token('Room', 'Laurel Grove')
-        cls.LOOKUP['Limerock'] = Token('Room', 'Limerock')
-        cls.LOOKUP['Marietta'] = Token('Room', 'Marietta')
-        cls.LOOKUP['New Holland'] = Token('Room', 'New Holland')
-        cls.LOOKUP['Paradise'] = Token('Room', 'Paradise')
-        cls.LOOKUP['Showroom'] = Token('Room', 'Showroom')
-        cls.LOOKUP['Strasburg'] = Token('Room', 'Strasburg')
-        cls.LOOKUP['Wheatland'] = Token('Room', 'Wheatland')
-
-        cls.LOOKUP['Terrace 1'] = Token('Room', 'Terrace 1')
-        cls.LOOKUP['Terrace 2'] = Token('Room', 'Terrace 2')
-        cls.LOOKUP['Terrace 3'] = Token('Room', 'Terrace 3')
-        cls.LOOKUP['Terrace 4'] = Token('Room', 'Terrace 4')
-        cls.LOOKUP['Terrace 5'] = Token('Room', 'Terrace 5')
-        cls.LOOKUP['Terrace 6'] = Token('Room', 'Terrace 6')
-        cls.LOOKUP['Terrace 7'] = Token('Room', 'Terrace 7')
-
-        cls.LOOKUP['Vista C'] = Token('Room', 'Vista C')
-        cls.LOOKUP['Vista D'] = Token('Room', 'Vista D')
-        cls.LOOKUP['Vista CD'] = Token('Room', 'Vista CD')
-        cls.LOOKUP['Vista'] = cls.LOOKUP['Vista CD']
+        cls.add_rooms(cls.HOST_ROOMS)
 
     @classmethod
     def initialize_icons(cls):
@@ -317,169 +362,186 @@ class Token(object):
 
     @staticmethod
     def encode_list(tokenlist):
-        return [' '.join([str(y) for y in x]) for x in tokenlist]
+        return [' '.join(map(str, x)) for x in tokenlist]
 
     @classmethod
     def tokenize(cls, tag):
         tokens = []
-        partial = ''
-
-        for tag in tag.descendants:
-            if isinstance(tag, Comment):
-                pass  # Always ignore comments
-            elif isinstance(tag, NavigableString):
-                partial += ' ' + str(tag)
-            elif isinstance(tag, Tag) and tag.name in ['img']:
-                tokens += cls.tokenize_text(partial)
-                partial = ''
-                tokens += cls.tokenize_icon(tag)
+        partial = []
+
+        extend = tokens.extend
+        for node in tag.descendants:
+            name = node.name
+            if name is None:  # Strings have no name
+                if type(node) is not Comment:  # Always ignore comments
+                    partial.append(str(node))
+            elif name == 'img':
+                extend(cls.tokenize_text(' '.join(partial)))
+                partial = []
+                extend(cls.tokenize_icon(node))
             else:
                 pass  # ignore other tags, for now
-                # LOG.debug( 'Ignored <%s>', tag.name )
+                # LOG.debug( 'Ignored <%s>', name )
 
         if partial:
-            tokens += cls.tokenize_text(partial)
+            extend(cls.tokenize_text(' '.join(partial)))
 
         return tokens
 
     @classmethod
     def tokenize_icon(cls, tag):
-        cls.initialize()
-
-        tokens = []
+        """Return the tuple of tokens for an icon, remembered by its src since the same icons repeat on every page"""
+        src = tag.get('src')
+        tokens = cls.ICON_SOURCES.get(src)
+        if tokens is not None:
+            return tokens
 
-        try:
-            name = tag['src'].lower()
-            name = name.split('/')[-1]
-            name = name.split('.')[0]
-        except:
+        if src is None:
             LOG.error("%s didn't have a 'src' attribute", tag)
-            return tokens
+            return ()
 
-        if name in cls.ICONS:
-            tokens.append(cls.ICONS[name])
-        elif name in ['stadium', 'class_a', 'class_b', 'coached']:
-            pass
+        name = src.rsplit('/', 1)[-1].split('.', 1)[0].lower()
+
+        token = cls.ICONS.get(name)
+        if token is not None:
+            tokens = (token,)
+        elif name in cls.IGNORED_ICONS:
+            tokens = ()
         elif name.startswith('for_'):
             form = name[4:]
             token = Token('Format', form)
             cls.ICONS[name] = token
-            tokens.append(token)
-            LOG.warn('Automatically added form [%s]', form)
+            tokens = (token,)
+            LOG.warning('Automatically added form [%s]', form)
         elif name.startswith('sty_'):
             style = name[4:]
             token = Token('Style', style)
             cls.ICONS[name] = token
-            tokens.append(token)
-            LOG.warn('Automatically added style [%s]', style)
+            tokens = (token,)
+            LOG.warning('Automatically added style [%s]', style)
         else:
-            LOG.warn('Ignored icon [%s]', name)
+            LOG.warning('Ignored icon [%s]', name)
+            return ()  # Not remembered, so that every unknown icon is still reported
 
+        cls.ICON_SOURCES[src] = tokens
         return tokens
 
     @classmethod
     def tokenize_text(cls, text):
-        cls.initialize()
+        """Return the tuple of tokens for text; results are shared, so callers must not modify them"""
 
-        data = text
+        # Cleanup crappy data (non-breaking spaces, newlines, runs of spaces)
+        return cls.tokenize_clean_text(cls.WHITESPACE_RE.sub(' ', text).strip())
 
+    @classmethod
+    @functools.lru_cache(maxsize=4096)
+    def tokenize_clean_text(cls, data):
+        """Return the tuple of tokens for whitespace-normalized data, remembering lines seen before"""
         junk = ''
         tokens = []
 
-        # Cleanup crappy data
-        data = data.replace('\xa0', ' ')
-        data = data.replace('\n', ' ')
-
-        data = data.strip()
-        data = data.replace(' ' * 11, ' ').replace(' ' * 7, ' ').replace(' ' * 5, ' ')
-        data = data.replace(' ' * 3, ' ').replace(' ' * 2, ' ')
-        data = data.replace(' ' * 2, ' ').replace(' ' * 2, ' ')
-        data = data.strip()
-
-        hdata = data.encode('unicode_escape')
-
-        while len(data):
-
-            # Ignore commas and semi-colons
-            if data[0] in ',;:':
-                data = data[1:]
-            else:
-                # Match Room names, event names, phrases, symbols
-                m = re.match(cls.PATTERN, data)
-                if m:
-                    text = m.group()
-                    tokens.append(cls.LOOKUP[text])
-                    data = data[len(text):]
-                else:
-                    # Match numbers
-                    m = re.match("\d+", data)
-                    if m:
-                        text = m.group()
-                        n = int(text)
-                        tokens.append(Token('Number', text, n))
-                        data = data[len(text):]
-                    else:
-                        junk += data[0]
-                        data = data[1:]
-
-            data = data.strip()
+        # Scan with a cursor, rather than repeatedly slicing and stripping the remaining data
+        scan = cls.SCANNER_RE.match
+        i = 0
+        n = len(data)
+        while i < n:
+            m = scan(data, i)
+            if m is None:
+                junk += data[i]
+                i += 1
+                continue
 
-        if junk:
+            kind = m.lastgroup
+            if kind == 'Phrase':
+                # Room names, event names, phrases, symbols
+                tokens.append(cls.LOOKUP[m.group()])
+            elif kind == 'Number':
+                text = m.group()
+                token = cls.NUMBERS.get(text)
+                if token is None:
+                    token = cls.NUMBERS[text] = Token('Number', text, int(text))
+                tokens.append(token)
+            # Otherwise ignore spaces, commas and semi-colons
+            i = m.end()
+
+        if junk and LOG.isEnabledFor(logging.NOTSET):
             hjunk = junk.encode('unicode_escape')
+            hdata = data.encode('unicode_escape')
             LOG.log(logging.NOTSET, 'Skipped [%s] in [%s]', hjunk, hdata)
 
-        return tokens
+        return tuple(tokens)
+
+
+Token.initialize()
 
 
 class Parser(object):
-    tokens = []
+    tokens = ()
+    pos = 0
     last_match = None
 
+    # Tokens that may follow a start time, with the hours each adds
+    TIME_SUFFIXES = {Token.AM: 0, Token.PM: 12, Token.PLUS: 0}  # FIXME: Do something with + => continuous???
+    TIME_SEPARATORS = frozenset(['&', '@'])
+
+    # Offset from the first day of the convention to midnight of each day
+    DAY_OFFSETS = {day: timedelta(days=day.value) for day in Token.DAYS.values()}
+
     def __init__(self, tokens):
-        self.tokens = list(tokens)
+        # Tokens are consumed by advancing pos; the sequence itself is never modified
+        self.tokens = tokens
+        self.pos = 0
 
     def __str__(self):
-        return "%s (%d) %s" % (self.last_match, self.count, self.tokens)
+        return "%s (%d) %s" % (self.last_match, self.count, self.tokens[self.pos:])
 
     @property
     def count(self):
-        return len(self.tokens)
+        return len(self.tokens) - self.pos
 
     def has(self, *prediction):
-        lookahead_length = len(prediction)
-        if self.count < lookahead_length:
+        if self.count < len(prediction):
             return False
 
-        pos = 0
-        for predicted in prediction:
-            lookahead = self.tokens[pos]
-            pos += 1
+        for lookahead, predicted in zip(self.tokens[self.pos:self.pos + len(prediction)], prediction):
+            if type(predicted) is Token:
+                if lookahead is not predicted:
+                    return False
+            elif lookahead.type != predicted:
+                return False
 
-            if isinstance(predicted, Token):
-                if lookahead == predicted:
-                    continue
-            elif lookahead.type == predicted:
-                continue
+        return True
 
-            return False
+    def signature(self, length):
+        """Return the kinds of the next length tokens"""
+        return tuple(token.kind for token in self.tokens[self.pos:self.pos + length])
 
-        return True
+    @staticmethod
+    def signatures(patterns):
+        """Key (prediction, handler) pairs by the token kinds each prediction expects"""
+        table = {}
+        for prediction, handler in patterns:
+            kinds = tuple(predicted.kind if type(predicted) is Token else predicted for predicted in prediction)
+            table[kinds] = handler
+        return table
 
     def is_not(self, *stops):
         if self.count < 1:
             return True
 
-        current = self.tokens[0]
+        current = self.tokens[self.pos]
         for stop in stops:
             if isinstance(stop, Token):
-                if current == stop:
+                if current is stop:
                     return False
             elif current.type == stop:
                 return False
         return True
 
     def __next__(self):
-        return self.tokens.pop(0)
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
 
     def match_3_events(self):
         """
@@ -580,35 +642,40 @@ class Parser(object):
         """
 
         results = []
-        while self.has('Day'):
-            day = next(self)
-            while self.is_not(Token.DASH, 'Room', 'Day'):
-                if self.has('Number', Token.DASH, 'Number'):
-                    time = next(self)
-                    next(self)
-                    next(self)
-                    results.append(timedelta(days=day.value, hours=time.value))
-                if self.has('Number'):
-                    offset = 0
-                    time = next(self)
-                    if self.has(Token.AM):
-                        next(self)
-                    elif self.has(Token.PM):
-                        next(self)
-                        offset = 12
-                    elif self.has(Token.PLUS):
-                        next(self)  # FIXME: Do something with + => continuous???
-                    results.append(timedelta(days=day.value, hours=time.value + offset))
-                elif self.has(Token.AND) or self.has(Token.AT):
-                    next(self)
+        tokens = self.tokens
+        n = len(tokens)
+        pos = self.pos
+        while pos < n and tokens[pos].type == 'Day':
+            midnight = self.DAY_OFFSETS[tokens[pos]]
+            pos += 1
+            while pos < n:
+                token = tokens[pos]
+                kind = token.kind
+                if kind == 'Number':
+                    if pos + 2 < n and tokens[pos + 1] is Token.DASH and tokens[pos + 2].type == 'Number':
+                        pos += 3  # Only the start of a range is kept
+                        offset = 0
+                    else:
+                        pos += 1
+                        offset = self.TIME_SUFFIXES.get(tokens[pos]) if pos < n else None
+                        if offset is None:
+                            offset = 0
+                        else:
+                            pos += 1
+                    results.append(midnight + ONE_HOUR * (token.value + offset))
+                elif kind in self.TIME_SEPARATORS:
+                    pos += 1
+                else:
+                    break  # A dash, room, or day ends this day's times; so does anything unexpected
 
+        self.pos = pos
         return results
 
     def match_room(self):
-        if self.count and self.tokens[0] == Token.DASH:
+        if self.count and self.tokens[self.pos] is Token.DASH:
             next(self)
 
-        if self.count and self.tokens[0].type == 'Room':
+        if self.count and self.tokens[self.pos].type == 'Room':
             return next(self)
 
         return None
@@ -619,19 +686,16 @@ class Parser(object):
 class WbcPreview(object):
     """This class is used to parse schedule data from the annual preview pages"""
 
-    tracking = [
-    ]
+    tracking = set()
+
+    FETCH_WORKERS = 4  # Uncached fetches are still paced by the global throttle in Web
 
     notes = {}
 
     class Event(object):
         """Simple data object to collect information about an event occuring at a specific time."""
 
-        code = None
-        name = None
-        type = None
-        time = None
-        location = None
+        __slots__ = ('code', 'name', 'type', 'time', 'location')
 
         def __init__(self, code, name, etype, etime, location):
             self.code = code
@@ -640,14 +704,16 @@ class WbcPreview(object):
             self.time = etime
             self.location = location
 
-        def __cmp__(self, other):
-            return cmp(self.time, other.time)
+        def __lt__(self, other):
+            return self.time < other.time
 
         def __str__(self):
             return '%s %s %s in %s at %s' % (self.code, self.name, self.type, self.location, self.time)
 
     class Tourney(object):
 
+        __slots__ = ('meta', 'code', 'name', 'notes', 'events', 'event_tokens', 'heats', 'rounds', 'max')
+
         def __init__(self, metax, code, name, page):
 
             self.meta = metax
@@ -669,10 +735,11 @@ class WbcPreview(object):
             #     rows = list(table.findAll('tr'))
             #     if rows[0].td
 
-            td = page.table.table.table.findAll('tr')[2].td
-            paras = list(td.findAll('p'))
+            # Only the third row is wanted, so stop searching once it has been found
+            td = page.table.table.table.find_all('tr', limit=3)[2].td
+            paras = td.find_all('p')
 
-            if len(paras):
+            if paras:
                 self.tokenize_events(paras)
                 self.parse_events()
                 self.check_consistency()
@@ -683,14 +750,15 @@ class WbcPreview(object):
 
 
         def tokenize_events(self, paras):
+            append = self.event_tokens.append
             for para in paras:
                 text = para.text.strip()
                 for line in text.split('\n'):
                     stripped = line.strip()
                     if stripped:
-                        self.event_tokens.append(Token.tokenize_text(stripped))
+                        append(Token.tokenize_text(stripped))
 
-            if self.code in WbcPreview.tracking:
+            if self.code in WbcPreview.tracking and LOG.isEnabledFor(logging.DEBUG):
                 for section in Token.encode_list(self.event_tokens):
                     LOG.debug("%s: %s", self.code, section)
 
@@ -713,221 +781,272 @@ class WbcPreview(object):
             Demo <day> <time> & <day> <time> & <time> & <day> <time> & <day> <time> @ <room>
             """
 
+            debug = LOG.isEnabledFor(logging.DEBUG)
+            lookup = self.ROW_HANDLERS.get
+            lengths = self.ROW_LENGTHS
+            longest = lengths[0]
             row_number = 0
             for row in self.event_tokens:
-                LOG.debug("Tourney %s Parsing row %d: %s", self.code, row_number, row)
+                if debug:
+                    LOG.debug("Tourney %s Parsing row %d: %s", self.code, row_number, row)
                 row_number += 1
 
                 p = Parser(row)
-                if p.has('Event', Token.SLASH, 'Event', Token.SLASH, 'Event', 'Day'):
-                    elist = p.match_3_events()
-                    times = p.match_date_times()
-                    room = p.match_room()
-                    self.add_events([e[0] for e in elist], times, room)
-                    self.max = max(self.max, 4)
-                    self.rounds.add(self.max - 2)
-                    self.rounds.add(self.max - 1)
-                    self.rounds.add(self.max)
-
-                elif p.has('Event', Token.SLASH, 'Event', 'Day'):
-                    elist = p.match_2_events()
-                    times = p.match_date_times()
-                    room = p.match_room()
-                    self.add_events([e[0] for e in elist], times, room)
-                    if elist[0][0] == 'QF':
-                        self.max = max(self.max, 4)
-                        self.rounds.add(self.max - 2)
-                        self.rounds.add(self.max - 1)
-                    elif elist[0][0] == 'SF':
-                        self.max = max(self.max, 3)
-                        self.rounds.add(self.max - 1)
-                        self.rounds.add(self.max)
-
-                elif p.has('Event', 'Number', Token.SLASH, 'Number', 'Event', 'Number', 'Day'):
-                    round, n, m = p.match_round()
-                    heat, h = p.match_heat()
-                    times = p.match_date_times()
-                    room = p.match_room()
-
-                    if round == 'R' and heat == 'H' and n == 1:
-                        ename = '%s%d' % (heat, h)
-                        if len(times) == 0:
-                            self.notes.append('Preview missing start time for %s in %s' % (ename, room))
-                        elif len(times) > 1:
-                            self.notes.append('Preview has extra start times for %s in %s' % (ename, room))
-                        else:
-                            self.add_event(ename, times[0], room)
-                        self.max = max(self.max, 2)
-                        self.rounds.add(1)
-                        if n in self.heats:
-                            self.notes.append('Preview has duplicate entry for %s' % ename)
-                        else:
-                            self.heats.add(h)
-
-                elif p.has('Event', 'Number', Token.DASH, 'Number', 'Day'):
-                    elist = p.match_multiple_heats()
-                    times = p.match_date_times()
-                    room = p.match_room()
-                    self.add_events(["%s%d" % event for event in elist], times, room)
-                    self.max = max(self.max, 2)
-                    self.rounds.add(1)
-
-                elif p.has('Event', 'Number', Token.SLASH, 'Number', 'Day'):
-                    name, n, m = p.match_round()
-                    times = p.match_date_times()
-                    room = p.match_room()
-
-                    if name == 'R':
-                        ename = '%s%d/%d' % (name, n, m)
-                        self.max = max(self.max, m)
-                        if n in self.rounds:
-                            self.notes.append('Preview has duplicate entry for %s' % ename)
-                        else:
-                            self.rounds.add(n)
-                    elif name == 'H':
-                        ename = '%s%d/%d' % (name, n, m)
-                        self.max = max(self.max, 2)
-                        self.rounds.add(1)
-                        if n in self.heats:
-                            self.notes.append('Preview has duplicate entry for %s' % ename)
-                        else:
-                            self.heats.add(n)
-                    else:
-                        ename = '%s %d/%d' % (name, n, m)
-
-                    self.add_event(ename, times[0], room)
+                signature = p.signature(longest)
+                for length in lengths:
+                    handler = lookup(signature[:length])
+                    if handler:
+                        handler(self, p)
+                        break
+                else:
+                    LOG.error('%s: Could not match %s', self.code, row)
 
-                elif p.has('Event', 'Number', 'Qualifier', 'Day'):
-                    name, n, qualifier = p.match_heat()
-                    times = p.match_date_times()
-                    room = p.match_room()
-                    ename = '%s %d %s' % (name, n, qualifier)
+        def parse_3_events(self, p):
+            """QF / SF / F <day> @ <time> -? <room>"""
+            elist = p.match_3_events()
+            times = p.match_date_times()
+            room = p.match_room()
+            self.add_events([e[0] for e in elist], times, room)
+            self.max = max(self.max, 4)
+            self.rounds.add(self.max - 2)
+            self.rounds.add(self.max - 1)
+            self.rounds.add(self.max)
+
+        def parse_2_events(self, p):
+            """QF / SF <day> @ <time> -? <room>"""
+            elist = p.match_2_events()
+            times = p.match_date_times()
+            room = p.match_room()
+            self.add_events([e[0] for e in elist], times, room)
+            if elist[0][0] == 'QF':
+                self.max = max(self.max, 4)
+                self.rounds.add(self.max - 2)
+                self.rounds.add(self.max - 1)
+            elif elist[0][0] == 'SF':
+                self.max = max(self.max, 3)
+                self.rounds.add(self.max - 1)
+                self.rounds.add(self.max)
+
+        def parse_round_heat(self, p):
+            """R # / # H # <day> @ <time> -? <room>"""
+            round, n, m = p.match_round()
+            heat, h = p.match_heat()
+            times = p.match_date_times()
+            room = p.match_room()
+
+            if round == 'R' and heat == 'H' and n == 1:
+                ename = '%s%d' % (heat, h)
+                if len(times) == 0:
+                    self.notes.append('Preview missing start time for %s in %s' % (ename, room))
+                elif len(times) > 1:
+                    self.notes.append('Preview has extra start times for %s in %s' % (ename, room))
+                else:
                     self.add_event(ename, times[0], room)
-                    if name == 'H':
-                        self.max = max(self.max, 2)
-                        self.rounds.add(1)
-                        if n in self.heats:
-                            self.notes.append('Preview has duplicate entry for %s' % ename)
-                        else:
-                            self.heats.add(n)
-
-                elif p.has('Event', 'Number', 'Day'):
-                    name, n = p.match_heat()
-                    times = p.match_date_times()
-                    room = p.match_room()
-                    ename = '%s%d' % (name, n)
-                    if len(times) == 0:
-                        self.notes.append('Preview missing start time for %s in %s' % (ename, room))
-                    elif len(times) > 1:
-                        self.notes.append('Preview has extra start times for %s in %s' % (ename, room))
-                    else:
-                        self.add_event(ename, times[0], room)
-
-                    if name == 'H':
-                        self.max = max(self.max, 2)
-                        self.rounds.add(1)
-                        if n in self.heats:
-                            self.notes.append('Preview has duplicate entry for %s' % ename)
-                        else:
-                            self.heats.add(n)
-
-                elif p.has('Qualifier', 'Event', 'Day'):
-                    event = p.match_qualified_event()
-                    times = p.match_date_times()
-                    room = p.match_room()
-                    ename = ' '.join(event)
-                    if len(times) == 0:
-                        self.notes.append('Preview missing start time for %s in %s' % (ename, room))
-                    elif len(times) > 1:
-                        self.notes.append('Preview has extra start times for %s in %s' % (ename, room))
-                    else:
-                        self.add_event(ename, times[0], room)
-
-                elif p.has('Event', 'Day'):
-                    event = p.match_event()
-                    times = p.match_date_times()
-                    room = p.match_room()
-
-                    count = len(times)
-                    name = event[0]
-                    if count > 1:
-                        names = ["%s %d/%d" % (name, i, count) for i in range(1, count + 1)]
-                        self.add_events(names, times, room)
-                    else:
-                        self.add_event(name, times[0], room)
-
-                    if name == 'QF':
-                        self.max = max(self.max, 4)
-                        self.rounds.add(self.max - 2)
-                    elif name == 'SF':
-                        self.max = max(self.max, 3)
-                        self.rounds.add(self.max - 1)
-                    elif name == 'F':
-                        self.max = max(self.max, 2)
-                        self.rounds.add(self.max)
-
-                elif p.has(Token.DASH):
-                    pass  # Do nothing
-
+                self.max = max(self.max, 2)
+                self.rounds.add(1)
+                if n in self.heats:
+                    self.notes.append('Preview has duplicate entry for %s' % ename)
                 else:
-                    LOG.error('%s: Could not match %s', self.code, row)
+                    self.heats.add(h)
+
+        def parse_multiple_heats(self, p):
+            """<event> # - # <day> @ <time> <time> <time> <time> -? <room>"""
+            elist = p.match_multiple_heats()
+            times = p.match_date_times()
+            room = p.match_room()
+            self.add_events(["%s%d" % event for event in elist], times, room)
+            self.max = max(self.max, 2)
+            self.rounds.add(1)
+
+        def parse_round(self, p):
+            """<event> # / # <day> @ <time> -? <room>"""
+            name, n, m = p.match_round()
+            times = p.match_date_times()
+            room = p.match_room()
+
+            if name == 'R':
+                ename = '%s%d/%d' % (name, n, m)
+                self.max = max(self.max, m)
+                if n in self.rounds:
+                    self.notes.append('Preview has duplicate entry for %s' % ename)
+                else:
+                    self.rounds.add(n)
+            elif name == 'H':
+                ename = '%s%d/%d' % (name, n, m)
+                self.max = max(self.max, 2)
+                self.rounds.add(1)
+                if n in self.heats:
+                    self.notes.append('Preview has duplicate entry for %s' % ename)
+                else:
+                    self.heats.add(n)
+            else:
+                ename = '%s %d/%d' % (name, n, m)
+
+            self.add_event(ename, times[0], room)
+
+        def parse_qualified_heat(self, p):
+            """<event> # <qualifier> <day> @ <time> -? <room>"""
+            name, n, qualifier = p.match_heat()
+            times = p.match_date_times()
+            room = p.match_room()
+            ename = '%s %d %s' % (name, n, qualifier)
+            self.add_event(ename, times[0], room)
+            if name == 'H':
+                self.max = max(self.max, 2)
+                self.rounds.add(1)
+                if n in self.heats:
+                    self.notes.append('Preview has duplicate entry for %s' % ename)
+                else:
+                    self.heats.add(n)
+
+        def parse_heat(self, p):
+            """<event> # <day> @ <time> -? <room>"""
+            name, n = p.match_heat()
+            times = p.match_date_times()
+            room = p.match_room()
+            ename = '%s%d' % (name, n)
+            if len(times) == 0:
+                self.notes.append('Preview missing start time for %s in %s' % (ename, room))
+            elif len(times) > 1:
+                self.notes.append('Preview has extra start times for %s in %s' % (ename, room))
+            else:
+                self.add_event(ename, times[0], room)
 
-            self.events.sort()
+            if name == 'H':
+                self.max = max(self.max, 2)
+                self.rounds.add(1)
+                if n in self.heats:
+                    self.notes.append('Preview has duplicate entry for %s' % ename)
+                else:
+                    self.heats.add(n)
+
+        def parse_qualified_event(self, p):
+            """<qualifier> <event> <day> @ <time> -? <room>"""
+            event = p.match_qualified_event()
+            times = p.match_date_times()
+            room = p.match_room()
+            ename = ' '.join(event)
+            if len(times) == 0:
+                self.notes.append('Preview missing start time for %s in %s' % (ename, room))
+            elif len(times) > 1:
+                self.notes.append('Preview has extra start times for %s in %s' % (ename, room))
+            else:
+                self.add_event(ename, times[0], room)
+
+        def parse_event(self, p):
+            """<event> <day> @ <time> -? <room>"""
+            event = p.match_event()
+            times = p.match_date_times()
+            room = p.match_room()
+
+            count = len(times)
+            name = event[0]
+            if count > 1:
+                names = ["%s %d/%d" % (name, i, count) for i in range(1, count + 1)]
+                self.add_events(names, times, room)
+            else:
+                self.add_event(name, times[0], room)
+
+            if name == 'QF':
+                self.max = max(self.max, 4)
+                self.rounds.add(self.max - 2)
+            elif name == 'SF':
+                self.max = max(self.max, 3)
+                self.rounds.add(self.max - 1)
+            elif name == 'F':
+                self.max = max(self.max, 2)
+                self.rounds.add(self.max)
+
+        def parse_nothing(self, p):
+            """- <anything>"""
+            pass  # Do nothing
+
+        # Row formats, in the order they are tried, with the method that parses each
+        ROW_PATTERNS = (
+            (('Event', Token.SLASH, 'Event', Token.SLASH, 'Event', 'Day'), parse_3_events),
+            (('Event', Token.SLASH, 'Event', 'Day'), parse_2_events),
+            (('Event', 'Number', Token.SLASH, 'Number', 'Event', 'Number', 'Day'), parse_round_heat),
+            (('Event', 'Number', Token.DASH, 'Number', 'Day'), parse_multiple_heats),
+            (('Event', 'Number', Token.SLASH, 'Number', 'Day'), parse_round),
+            (('Event', 'Number', 'Qualifier', 'Day'), parse_qualified_heat),
+            (('Event', 'Number', 'Day'), parse_heat),
+            (('Qualifier', 'Event', 'Day'), parse_qualified_event),
+            (('Event', 'Day'), parse_event),
+            ((Token.DASH,), parse_nothing),
+        )
+
+        # No row format is a prefix of another, so at most one can match a row and one probe per length finds it
+        ROW_HANDLERS = Parser.signatures(ROW_PATTERNS)
+        ROW_LENGTHS = sorted(set(len(kinds) for kinds in ROW_HANDLERS), reverse=True)
 
         def add_event(self, name, time, room):
-            event_time = localize(self.meta.first_day + time)
+            event_time = localize_cached(self.meta.first_day + time)
             if room is None:
                 self.notes.append('Preview missing room for %s at %s' % (name, event_time))
             else:
                 event = WbcPreview.Event(self.code, self.name, name, event_time, room.label)
-                self.events.append(event)
+                bisect.insort(self.events, event)  # Keep events in time order
 
         def add_events(self, names, times, room):
             for i in range(len(times), len(names)):
-                self.notes.append('Preview missing start time for %s in %s' % (names[i], room.label))
+                self.notes.append('Preview missing start time for %s in %s' % (names[i], room))
 
             for name, time in zip(names, times):
                 self.add_event(name, time, room)
 
         def check_consistency(self):
             if self.max:
-                missing = list(set(range(1, self.max + 1)) - self.rounds)
-                missing.sort()
-                for r in missing:
-                    self.notes.append('Preview missing start time for R%d/%d' % (r, self.max))
+                for r in range(1, self.max + 1):  # Already in order, so no set difference or sort needed
+                    if r not in self.rounds:
+                        self.notes.append('Preview missing start time for R%d/%d' % (r, self.max))
 
     def __init__(self, metadata):
         self.meta = metadata
-        self.tracking.extend(metadata.tracking)
+        self.tracking.update(metadata.tracking)
 
         self.valid = False
         self.events = {}
 
-        Token.initialize()
-
         LOG.info("Loading event previews...")
         LOG.debug("Assuming first day is %s", self.meta.first_day)
 
-        for code, url in sorted(self.meta.url.items()):
-            LOG.debug("Loading event preview for [%s]: %s", code, url)
-            if len(self.tracking) and code not in self.tracking:
-                continue
+        names = self.meta.names
+        tracking = self.tracking
+        urls = self.meta.url.items()
+        if tracking:
+            urls = [(code, url) for code, url in urls if code in tracking]
+        previews = [(code, names[code], url) for code, url in sorted(urls)]
+
+        # Fetching is network bound, so download the pages concurrently, but parse them in code order
+        with ThreadPoolExecutor(max_workers=self.FETCH_WORKERS) as executor:
+            fetches = {}  # Tourneys only read their pages, so codes sharing a URL share one download
+            pending = collections.Counter(url for code, name, url in previews)
+            for code, name, url in previews:
+                if url not in fetches:
+                    fetches[url] = executor.submit(parse_url, url)
+
+            for code, name, url in previews:
+                LOG.debug("Loading event preview for [%s]: %s", code, url)
+                page = fetches[url].result()
+                pending[url] -= 1
+                if not pending[url]:
+                    del fetches[url]  # Release the page once its last code has been parsed
+                self.load_preview(code, name, url, page)
+                del page
 
-            if code not in self.notes:
-                self.notes[code] = []
+        self.valid = True
 
-            page = parse_url(url)
-            if page:
-                t = WbcPreview.Tourney(self.meta, code, self.meta.names[code], page)
-                self.events[code] = t.events
-                self.notes[code].extend(t.notes)
-            else:
-                message = 'Unable to load event preview for %s from %s' % (code, url)
-                self.notes[code].append(message)
-                LOG.error(message)
-                pass
+    def load_preview(self, code, name, url, page):
+        notes = self.notes.setdefault(code, [])
 
-        self.valid = True
+        if page:
+            t = WbcPreview.Tourney(self.meta, code, name, page)
+            self.events[code] = t.events
+            notes.extend(t.notes)
+        else:
+            message = 'Unable to load event preview for %s from %s' % (code, url)
+            notes.append(message)
+            LOG.error(message)
 
 
 # ----- Testing --------------------------------------------------------------
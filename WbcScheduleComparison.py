@@ -142,20 +142,20 @@ class ScheduleComparer(object):
             details = [(None,), (None,), (None,), ]
 
             # Fill in the Preview event, if present
-            if starting_time in prv_timemap:
-                e = prv_timemap[starting_time]
+            e = prv_timemap.get(starting_time)
+            if e is not None:
                 location = self.DEMO_HALL if e.location and e.location.startswith(self.DEMO_HALL) else e.location
                 details[0] = (location, e.type)
 
             # Fill in the All-in-One event, if present
-            if starting_time in ai1_timemap:
-                e = ai1_timemap[starting_time]
+            e = ai1_timemap.get(starting_time)
+            if e is not None:
                 location = self.DEMO_HALL if e.location == self.DEMO_AI1 else e.location
                 details[1] = (location, e.type)
 
             # Fill in the spreadsheet event, if present
-            if starting_time in cal_timemap:
-                e = cal_timemap[starting_time]
+            e = cal_timemap.get(starting_time)
+            if e is not None:
                 location = self.DEMO_HALL if e['location'].startswith(self.DEMO_HALL) else e['location']
                 summary = str(e['summary'])
                 try:
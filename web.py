@@ -17,6 +17,7 @@
 
 import codecs
 import logging
+import threading
 import time
 from datetime import timedelta
 
@@ -40,28 +41,35 @@ LATIN1 = codecs.getdecoder('latin-1')
 
 class Web(object):
     session = None
+    session_lock = threading.Lock()
+    throttle_lock = threading.Lock()
     expiration = 180
 
     @classmethod
     def make_throttle_hook(cls, timeout=1.0):
         """
         Returns a response hook function which sleeps for `timeout` seconds if
-        response is not cached
+        response is not cached; the sleeps are serialized across threads, so
+        concurrent fetches still see at most one uncached response per `timeout`
         """
 
         def hook(response, **kwargs):
             if not getattr(response, 'from_cache', False):
                 # LOG.debug('Cache throttling; %g seconds' % timeout)
-                time.sleep(timeout)
+                with cls.throttle_lock:
+                    time.sleep(timeout)
             return response
 
         return hook
 
     @classmethod
     def load(cls, url, cached=True):
-        if not cls.session:
-            cls.session = requests_cache.CachedSession('cache', expire_after=timedelta(days=cls.expiration))
-            cls.session.hooks = {'response': cls.make_throttle_hook(0.1)}
+        # The session is shared by fetch threads once created: it is never reconfigured, urllib3's connection
+        # pool is thread-safe, and the SQLite cache backend uses per-thread connections with serialized writes
+        with cls.session_lock:
+            if not cls.session:
+                cls.session = requests_cache.CachedSession('cache', expire_after=timedelta(days=cls.expiration))
+                cls.session.hooks = {'response': cls.make_throttle_hook(0.1)}
 
         if cached:
             response = cls.session.get(url)